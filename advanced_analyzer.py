@@ -4,46 +4,162 @@ Analyzes text word-by-word and tracks tone shifts
 """
 
 import re
-from datasets import DATASETS, TONE_SHIFTS, WEIGHTS, get_all_words
+import string
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+# Word tokenizer, compiled once at import
+_WORD_RE = re.compile(r'\b\w+\b')
+
+# ASCII fast path: map every non-word character to a space, then split
+_WORD_CHARS = string.ascii_letters + string.digits + '_'
+_NON_WORD_TO_SPACE = str.maketrans({
+    c: ' ' for c in map(chr, range(128)) if c not in _WORD_CHARS
+})
+
+# Common neutral words that are never flagged on their own
+_COMMON_NEUTRAL = frozenset((
+    'i', 'you', 'he', 'she', 'they', 'we', 'all', 'people',
+    'is', 'are', 'am', 'was', 'were', 'be', 'been',
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'for'
+))
+
+# Number of distinct texts whose analysis is kept per analyzer
+ANALYSIS_CACHE_SIZE = 8192
+# Longer texts are analyzed without the cache so it never holds large strings
+ANALYSIS_CACHE_MAX_TEXT = 1000
+
+# Human-readable emotion label per category
+_EMOTION_LABELS = {
+    'hate': 'HATEFUL',
+    'moderate': 'OFFENSIVE',
+    'safe': 'POSITIVE'
+}
+
+
+@lru_cache(maxsize=1)
+def _datasets():
+    """Import the datasets module on first use instead of at import time"""
+    import datasets
+    return datasets
+
+
+@lru_cache(maxsize=1)
+def _numpy():
+    """Import NumPy for the first batch instead of at import time, None when not installed"""
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+@lru_cache(maxsize=1)
+def _word_index():
+    """Flatten the word lookup into word -> PhraseEntry(category, subcategory, weight)"""
+    index = {}
+    data = _datasets()
+    all_words = data.get_all_words()
+    for category in ('hate', 'moderate', 'safe'):
+        for word, subcategory_id in all_words[category].items():
+            # Earlier categories take priority, as in the original lookup order
+            index.setdefault(word, data.PhraseEntry(category, data.SUBCATEGORY_NAMES[subcategory_id],
+                                                    data.WEIGHT_BY_SUBCAT[subcategory_id]))
+    return index
+
+
+@lru_cache(maxsize=1)
+def _phrase_records():
+    """
+    Flat (phrase, category, subcategory, weight) tuple in dataset order
+    with weights resolved once; entries are stored lowercase
+    """
+    data = _datasets()
+    return tuple(
+        (phrase, category, subcategory, data.WEIGHTS[category].get(subcategory, 0.5))
+        for category in data.DATASETS
+        for subcategory, phrases in data.DATASETS[category].items()
+        for phrase in phrases
+    )
+
+
+class WordHit:
+    """Compact record for a matched word or phrase"""
+    
+    __slots__ = ('word', 'position', 'category', 'subcategory', 'weight', 'emotion', 'entry')
+    
+    def __init__(self, word, position, category, subcategory, weight, emotion, entry=None):
+        self.word = word
+        self.position = position
+        self.category = category
+        self.subcategory = subcategory
+        self.weight = weight
+        self.emotion = emotion
+        # Index of the matched dataset entry in dataset order, when known
+        self.entry = entry
+    
+    def to_dict(self):
+        """Convert to the plain dict returned by the public API"""
+        return {
+            'word': self.word,
+            'position': self.position,
+            'category': self.category,
+            'subcategory': self.subcategory,
+            'weight': self.weight,
+            'emotion': self.emotion
+        }
+
+
+def _copy_result(value):
+    """
+    Deep copy for analysis results, which only hold dicts, lists and
+    immutable scalars; much cheaper than copy.deepcopy's generic path
+    """
+    if isinstance(value, dict):
+        return {key: _copy_result(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_result(item) for item in value]
+    return value
+
+
+def _make_analysis(word, position, category, subcategory, weight, entry=None):
+    """Build the analysis record for a matched word or phrase"""
+    return WordHit(word, position, category, subcategory, weight,
+                   _EMOTION_LABELS.get(category, 'NEUTRAL'), entry)
 
 
 class EmotionTracker:
     """Track emotions throughout the sentence"""
     
-    def __init__(self):
+    def __init__(self, word_index=None):
         self.timeline = []
-        self.all_words = get_all_words()
+        self.word_index = word_index if word_index is not None else _word_index()
         
     def analyze_word(self, word, position, full_text=""):
         """Analyze a single word and return its emotion"""
         word_lower = word.lower()
         
-        # Don't flag common neutral words individually
-        common_neutral = ['i', 'you', 'he', 'she', 'they', 'we', 'all', 'people', 
-                         'is', 'are', 'am', 'was', 'were', 'be', 'been', 
-                         'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'for']
-        
         # Check for exact phrase matches first (higher priority)
         phrase_match = self._check_phrases_in_context(word_lower, position, full_text)
         if phrase_match:
             return phrase_match
         
+        return self.analyze_single_word(word, position)
+    
+    def analyze_single_word(self, word, position):
+        """Analyze a word on its own, without looking at phrases"""
+        word_lower = word.lower()
+        
         # Skip common neutral words if no phrase match
-        if word_lower in common_neutral:
+        if word_lower in _COMMON_NEUTRAL:
             return None
         
         # Check single word in datasets (only if not common word)
-        for category in ['hate', 'moderate', 'safe']:
-            if word_lower in self.all_words[category]:
-                info = self.all_words[category][word_lower]
-                return {
-                    'word': word,
-                    'position': position,
-                    'category': category,
-                    'subcategory': info['subcategory'],
-                    'weight': info['weight'],
-                    'emotion': self._get_emotion_label(category)
-                }
+        hit = self.word_index.get(word_lower)
+        if hit:
+            category, subcategory, weight = hit
+            return _make_analysis(word, position, category, subcategory, weight)
         
         return None
     
@@ -52,19 +168,11 @@ class EmotionTracker:
         text_lower = full_text.lower()
         
         # Check multi-word phrases
-        for category in DATASETS:
-            for subcategory, phrases in DATASETS[category].items():
-                for phrase in phrases:
-                    # Check if phrase exists in text
-                    if phrase.lower() in text_lower and word in phrase.lower():
-                        return {
-                            'word': phrase,  # Return full phrase
-                            'position': position,
-                            'category': category,
-                            'subcategory': subcategory,
-                            'weight': WEIGHTS[category].get(subcategory, 0.5),
-                            'emotion': self._get_emotion_label(category)
-                        }
+        for phrase, category, subcategory, weight in _phrase_records():
+            # Check if phrase exists in text
+            if phrase in text_lower and word in phrase:
+                # Return full phrase
+                return _make_analysis(phrase, position, category, subcategory, weight)
         
         return None
     
@@ -74,12 +182,11 @@ class EmotionTracker:
     
     def _get_emotion_label(self, category):
         """Get human-readable emotion label"""
-        labels = {
-            'hate': 'HATEFUL',
-            'moderate': 'OFFENSIVE',
-            'safe': 'POSITIVE'
-        }
-        return labels.get(category, 'NEUTRAL')
+        return _EMOTION_LABELS.get(category, 'NEUTRAL')
+    
+    def reset(self):
+        """Clear the timeline so the tracker can be reused for another text"""
+        self.timeline.clear()
     
     def add_to_timeline(self, analysis):
         """Add word analysis to timeline"""
@@ -91,19 +198,27 @@ class EmotionTracker:
         if len(self.timeline) < 2:
             return None
         
-        emotions = [item['emotion'] for item in self.timeline if item]
+        # Single pass: first emotion and where each of HATEFUL/POSITIVE first appears
+        first_emotion = None
+        hateful_idx = positive_idx = None
+        count = 0
+        for item in self.timeline:
+            if not item:
+                continue
+            emotion = item.emotion
+            if first_emotion is None:
+                first_emotion = emotion
+            if emotion == 'HATEFUL' and hateful_idx is None:
+                hateful_idx = count
+            elif emotion == 'POSITIVE' and positive_idx is None:
+                positive_idx = count
+            count += 1
         
-        if not emotions or len(emotions) < 2:
+        if count < 2:
             return None
         
-        # Get first and last emotion positions
-        first_emotion = emotions[0]
-        last_emotion = emotions[-1]
-        
         # Check for positive to hate shift
-        if first_emotion == 'POSITIVE' and 'HATEFUL' in emotions:
-            # Find where it turned hateful
-            hateful_idx = emotions.index('HATEFUL')
+        if first_emotion == 'POSITIVE' and hateful_idx is not None:
             return {
                 'shift_type': 'POSITIVE_TO_HATE',
                 'start_emotion': 'POSITIVE',
@@ -112,9 +227,7 @@ class EmotionTracker:
             }
         
         # Check for hate to positive (redemption)
-        if first_emotion == 'HATEFUL' and 'POSITIVE' in emotions:
-            # Find where it turned positive
-            positive_idx = emotions.index('POSITIVE')
+        if first_emotion == 'HATEFUL' and positive_idx is not None:
             return {
                 'shift_type': 'HATE_TO_POSITIVE',
                 'start_emotion': 'HATEFUL',
@@ -128,8 +241,8 @@ class EmotionTracker:
         """Get timeline summary"""
         return {
             'total_words_analyzed': len(self.timeline),
-            'emotions_detected': [item['emotion'] for item in self.timeline if item],
-            'timeline': self.timeline
+            'emotions_detected': [item.emotion for item in self.timeline if item],
+            'timeline': [item.to_dict() for item in self.timeline]
         }
 
 
@@ -139,41 +252,193 @@ class AdvancedHateSpeechAnalyzer:
     """
     
     def __init__(self):
-        self.all_words = get_all_words()
+        self._word_index = _word_index()
+        
+        # Flat phrase records shared with EmotionTracker
+        self._phrases = _phrase_records()
+        # Shared Aho-Corasick automaton from datasets, None without pyahocorasick
+        self._automaton = _datasets().AHOCORASICK
+        self._trie = None
+        if self._automaton is None:
+            # Next best: the shared marisa RecordTrie, None without marisa-trie
+            self._trie = _datasets().TRIE
+            self._phrase_start = _datasets().PHRASE_START
+            self._max_phrase_len = max(len(entry[0]) for entry in self._phrases)
+        
+        # Fallback index: first character -> phrase indices, shortest first
+        self._phrases_by_first_char = defaultdict(list)
+        for idx in sorted(range(len(self._phrases)), key=lambda i: len(self._phrases[i][0])):
+            self._phrases_by_first_char[self._phrases[idx][0][:1]].append(idx)
+        
+        # One reusable tracker per thread
+        self._local = threading.local()
+        
+        # Analysis only depends on the text and the static datasets
+        self._analyze_cached = lru_cache(maxsize=ANALYSIS_CACHE_SIZE)(self._analyze)
+        
+    def _find_phrases(self, text_lower):
+        """Return the indices of the dataset phrases that occur in lowercased text, in dataset order"""
+        if self._automaton is not None:
+            # Payload order is the entry's index in dataset order
+            return sorted({payload[0] for _, payload in self._automaton.iter(text_lower)})
+        
+        if self._trie is not None:
+            # Phrases can start mid-word, so probe prefixes at every offset
+            # whose first two characters begin some phrase
+            max_len = self._max_phrase_len
+            found = set()
+            for start in self._phrase_start.finditer(text_lower):
+                pos = start.start()
+                for phrase_lower in self._trie.prefixes(text_lower[pos:pos + max_len]):
+                    # Record order is the phrase's first index in dataset order
+                    found.add(self._trie[phrase_lower][0][0])
+            return sorted(found)
+        
+        # One regex pass rules out texts containing no entry at all
+        if _datasets().PATTERN.search(text_lower) is None:
+            return []
+        
+        # Only phrases starting with a character in the text and no longer
+        # than the text can match
+        text_len = len(text_lower)
+        found = []
+        for char in self._phrases_by_first_char.keys() & set(text_lower):
+            for idx in self._phrases_by_first_char[char]:
+                phrase_lower = self._phrases[idx][0]
+                if len(phrase_lower) > text_len:
+                    break
+                if phrase_lower in text_lower:
+                    found.append(idx)
+        return sorted(found)
+    
+    def _scan_phrases(self, text_lower, words):
+        """
+        Match phrases once per lowercased text
+        Returns {token_index: analysis} for tokens covered by a present phrase
+        """
+        present = self._find_phrases(text_lower)
+        if not present:
+            return {}
+        
+        phrases = self._phrases
+        hits = {}
+        first_match = {}  # word -> index of the first present phrase containing it
+        for i, word in enumerate(words):
+            if word not in first_match:
+                first_match[word] = next(
+                    (idx for idx in present if word in phrases[idx][0]), None
+                )
+            idx = first_match[word]
+            if idx is not None:
+                phrase, category, subcategory, weight = phrases[idx]
+                hits[i] = _make_analysis(phrase, i, category, subcategory, weight, idx)
+        return hits
         
-    def analyze_text(self, text):
+    def analyze_text(self, text, max_items=None):
         """
         Main analysis function
         Returns detailed analysis with emotion tracking
+        max_items caps the per-word word_analysis and emotion_timeline lists
+        """
+        if len(text) > ANALYSIS_CACHE_MAX_TEXT:
+            # Fresh result, nothing shared to protect
+            result = self._analyze(text)
+            if max_items is not None:
+                result['word_analysis'] = result['word_analysis'][:max_items]
+                result['emotion_timeline'] = result['emotion_timeline'][:max_items]
+            return result
+        
+        result = self._analyze_cached(text)
+        if max_items is not None:
+            # Slice before copying so dropped entries are never copied
+            result = dict(result,
+                          word_analysis=result['word_analysis'][:max_items],
+                          emotion_timeline=result['emotion_timeline'][:max_items])
+        # Copy so callers can't modify the cached result
+        return _copy_result(result)
+    
+    def analyze_batch(self, texts):
         """
-        # Initialize tracker
-        tracker = EmotionTracker()
+        Analyze several texts at once
+        Category scores for the whole batch are summed in one call to
+        datasets.score_hits
+        """
+        np = _numpy()
+        if np is None:
+            return [self.analyze_text(text) for text in texts]
+        
+        data = _datasets()
+        matches = [self._match(text) for text in texts]
+        
+        # Every hit of the batch as one flat array of dataset entry indices,
+        # one slice per text
+        offsets = np.zeros(len(matches) + 1, dtype=np.int64)
+        for t, (word_analyses, _) in enumerate(matches):
+            offsets[t + 1] = offsets[t] + len(word_analyses)
+        hits = np.fromiter(
+            (a.entry for word_analyses, _ in matches for a in word_analyses),
+            dtype=np.intp, count=offsets[-1]
+        )
+        scores = data.score_hits(hits, offsets)
+        # Categories without hits stay int 0, as in _calculate_scores
+        return [
+            self._build_result(text, word_analyses, tone_shift,
+                               [score or 0 for score in scores[t].tolist()])
+            for t, (text, (word_analyses, tone_shift)) in enumerate(zip(texts, matches))
+        ]
+    
+    def _analyze(self, text):
+        """Uncached analysis of a single text"""
+        word_analyses, tone_shift = self._match(text)
+        scores = self._calculate_scores(word_analyses)
+        return self._build_result(text, word_analyses, tone_shift, scores)
+    
+    def _tracker(self):
+        """Return this thread's tracker, reset for a new text"""
+        tracker = getattr(self._local, 'tracker', None)
+        if tracker is None:
+            tracker = self._local.tracker = EmotionTracker(self._word_index)
+        else:
+            tracker.reset()
+        return tracker
+    
+    def _match(self, text):
+        """Find dataset matches in text, returns (word_analyses, tone_shift)"""
+        # Reuse this thread's tracker
+        tracker = self._tracker()
+        
+        # Lowercase once and share it between tokenizing and phrase matching
+        text_lower = text.lower()
         
         # Tokenize
-        words = self._tokenize(text)
+        words = self._tokenize(text_lower)
+        
+        # Match dataset entries once up front instead of per word. Every
+        # single-word entry is itself a phrase in DATASETS, so a token that
+        # would match on its own is always covered here as well and no
+        # separate per-word lookup is needed.
+        phrase_hits = self._scan_phrases(text_lower, words)
         
         # Track phrases already detected to avoid duplicates
         detected_phrases = set()
         
-        # Analyze each word
+        # Collect matches in token order
         word_analyses = []
-        for i, word in enumerate(words):
-            analysis = tracker.analyze_word(word, i, text)  # Pass full text for context
+        for analysis in phrase_hits.values():
             if analysis:
                 # Check if this phrase was already detected
-                phrase_key = f"{analysis['word']}_{analysis['position']}"
+                phrase_key = (analysis.position, analysis.word)
                 if phrase_key not in detected_phrases:
                     detected_phrases.add(phrase_key)
                     tracker.add_to_timeline(analysis)
                     word_analyses.append(analysis)
         
-        # Calculate scores
-        hate_score = self._calculate_score(word_analyses, 'hate')
-        moderate_score = self._calculate_score(word_analyses, 'moderate')
-        safe_score = self._calculate_score(word_analyses, 'safe')
-        
         # Detect tone shift
-        tone_shift = tracker.detect_tone_shift()
+        return word_analyses, tracker.detect_tone_shift()
+    
+    def _build_result(self, text, word_analyses, tone_shift, scores):
+        """Classify from the category scores and assemble the result dict"""
+        hate_score, moderate_score, safe_score = scores
         
         # Determine final classification
         final_class = self._classify(hate_score, moderate_score, safe_score, tone_shift)
@@ -192,25 +457,35 @@ class AdvancedHateSpeechAnalyzer:
                 'final': round(final_class['final_score'], 3)
             },
             'tone_shift': tone_shift,
-            'word_analysis': word_analyses,
-            'emotion_timeline': tracker.timeline,
+            'word_analysis': [a.to_dict() for a in word_analyses],
+            # The timeline holds exactly the matches, in order
+            'emotion_timeline': [a.to_dict() for a in word_analyses],
             'message': message,
             'details': self._get_detailed_breakdown(word_analyses, tone_shift)
         }
     
-    def _tokenize(self, text):
-        """Tokenize text into words"""
+    def _tokenize(self, text_lower):
+        """Tokenize lowercased text into words"""
         # Remove punctuation but keep structure
-        words = re.findall(r'\b\w+\b', text.lower())
-        return words
+        if text_lower.isascii():
+            return text_lower.translate(_NON_WORD_TO_SPACE).split()
+        return _WORD_RE.findall(text_lower)
     
-    def _calculate_score(self, analyses, category):
-        """Calculate weighted score for a category"""
-        score = 0
+    def _calculate_scores(self, analyses):
+        """Calculate weighted hate, moderate and safe scores in one pass"""
+        hate = moderate = safe = 0
         for analysis in analyses:
-            if analysis and analysis['category'] == category:
-                score += abs(analysis['weight'])
-        return score
+            if not analysis:
+                continue
+            category = analysis.category
+            weight = abs(analysis.weight)
+            if category == 'hate':
+                hate += weight
+            elif category == 'moderate':
+                moderate += weight
+            elif category == 'safe':
+                safe += weight
+        return hate, moderate, safe
     
     def _classify(self, hate_score, moderate_score, safe_score, tone_shift):
         """Determine final classification"""
@@ -286,31 +561,42 @@ class AdvancedHateSpeechAnalyzer:
         """Identify what groups are being targeted"""
         targets = set()
         for analysis in word_analyses:
-            if analysis and analysis['category'] == 'hate':
-                subcategory = analysis['subcategory']
+            if analysis and analysis.category == 'hate':
+                subcategory = analysis.subcategory
                 if subcategory in ['religion', 'race', 'ethnicity', 'gender', 'lgbtq']:
                     targets.add(subcategory)
         return list(targets)
     
     def _get_detailed_breakdown(self, word_analyses, tone_shift):
         """Get detailed breakdown of analysis"""
-        hate_words = [a for a in word_analyses if a and a['category'] == 'hate']
-        moderate_words = [a for a in word_analyses if a and a['category'] == 'moderate']
-        safe_words = [a for a in word_analyses if a and a['category'] == 'safe']
+        # Split by category in a single pass
+        hate_words, moderate_words, safe_words = [], [], []
+        hate_subcategories = set()
+        for a in word_analyses:
+            if not a:
+                continue
+            category = a.category
+            if category == 'hate':
+                hate_words.append(a.word)
+                hate_subcategories.add(a.subcategory)
+            elif category == 'moderate':
+                moderate_words.append(a.word)
+            elif category == 'safe':
+                safe_words.append(a.word)
         
         breakdown = {
             'hate_words': {
                 'count': len(hate_words),
-                'words': [a['word'] for a in hate_words],
-                'subcategories': list(set(a['subcategory'] for a in hate_words))
+                'words': hate_words,
+                'subcategories': list(hate_subcategories)
             },
             'moderate_words': {
                 'count': len(moderate_words),
-                'words': [a['word'] for a in moderate_words]
+                'words': moderate_words
             },
             'safe_words': {
                 'count': len(safe_words),
-                'words': [a['word'] for a in safe_words]
+                'words': safe_words
             }
         }
         
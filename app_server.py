@@ -1,35 +1,280 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, make_response, g
 from flask_cors import CORS
 import joblib
+import numpy as np
+from scipy import sparse
 import re
-from transformers import pipeline
+import json
+from transformers import AutoTokenizer, pipeline
 import os
-import gc
+import hashlib
+import queue
+import time
+import math
+from collections import OrderedDict, defaultdict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from functools import wraps
 from advanced_analyzer import AdvancedHateSpeechAnalyzer
 
-# Try to import torch for cleanup
+# Try to import torch for deep model optimizations
 try:
     import torch
     HAS_TORCH = True
 except ImportError:
     HAS_TORCH = False
 
+# Try to import pyahocorasick for single-pass keyword matching
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+# Try to import orjson for faster request/response JSON
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# Try to import cachetools for the prediction response cache
+try:
+    from cachetools import LRUCache
+    HAS_CACHETOOLS = True
+except ImportError:
+    HAS_CACHETOOLS = False
+
 app = Flask(__name__, static_folder='.')
 CORS(app)
 
+# Let a fronting server (Apache mod_xsendfile, lighttpd) stream static files with sendfile(2)
+app.use_x_sendfile = os.environ.get('USE_X_SENDFILE', '0') == '1'
+
 # Global variables for models
 basic_model = None
 vectorizer = None
+vectorize = None  # vectorizer.transform, or a TfidfRowEncoder over it
 deep_classifier = None
 advanced_analyzer = None
 
 # Lock for thread safety
-from threading import Lock
+from threading import Lock, Thread
 model_lock = Lock()
 
+# Model request batching
+DEEP_BATCH_SIZE = 16        # Max texts per forward pass
+DEEP_BATCH_WINDOW = 0.005   # Seconds to wait for more requests to join a batch
+DEEP_TIMEOUT = 60           # Seconds a request waits for its prediction
+BASIC_BATCH_SIZE = 64       # Max texts per vectorizer/predict_proba call
+BASIC_BATCH_WINDOW = 0.002
+
+# Substrings marking a deep model label as hateful, and the resolved label -> is-hate table
+HATE_LABEL_KEYS = ('LABEL_1', 'HATE', 'TOXIC')
+HATE_LABEL_MAP = {}
+
+# Max word_analysis / emotion_timeline entries returned by /predict/advanced
+ADVANCED_MAX_ITEMS = 20
+
+# Advanced analyzer classifications counted as hate in consensus votes
+ADVANCED_HATE_CLASSES = frozenset(['HATE_SPEECH', 'MODERATE_HATE'])
+# /predict/all consensus weights
+ALL_MODEL_WEIGHTS = {'advanced': 0.5, 'deep': 0.3, 'basic': 0.2}
+
+# /predict/all skips the deep model when the advanced analyzer is at least this confident
+HIGH_CONF_THRESHOLD = 0.9
+
+# Deep model runtime: 'torch' (eager), 'onnx' (ONNX Runtime via optimum)
+# or 'compile' (torch.compile)
+DEEP_MODEL_BACKEND = os.environ.get('DEEP_MODEL_BACKEND', 'torch').lower()
+# Token budget per input; attention cost grows quadratically with sequence length
+DEEP_MAX_TOKENS = int(os.environ.get('DEEP_MAX_TOKENS', 128))
+# Opt-in dynamic INT8 quantization of the PyTorch model's Linear layers on CPU
+# (set to 1); it shifts the deep model's probabilities slightly, so FP32 is the default
+DEEP_MODEL_INT8 = os.environ.get('DEEP_MODEL_INT8', '0') == '1'
+
+# ------------------ KEYWORD MATCHING ------------------
+class KeywordMatcher:
+    """Substring matcher over named keyword groups, one Aho-Corasick pass when available"""
+
+    def __init__(self, groups):
+        self.groups = {name: frozenset(keywords) for name, keywords in groups.items()}
+        # Each distinct keyword is searched once and credited to every group containing it
+        owners = defaultdict(list)
+        for name, keywords in self.groups.items():
+            for keyword in keywords:
+                owners[keyword].append(name)
+        self.owners = {keyword: tuple(names) for keyword, names in owners.items()}
+        self.automaton = None
+        if HAS_AHOCORASICK:
+            self.automaton = ahocorasick.Automaton()
+            for keyword, names in self.owners.items():
+                self.automaton.add_word(keyword, (keyword, names))
+            self.automaton.make_automaton()
+
+    def scan(self, text_lower):
+        """Map each group name to the set of its keywords occurring in text_lower"""
+        found = {name: set() for name in self.groups}
+        if self.automaton is not None:
+            hits = self.automaton.iter(text_lower)
+        else:
+            hits = ((None, (keyword, names)) for keyword, names in self.owners.items()
+                    if keyword in text_lower)
+        for _, (keyword, names) in hits:
+            for name in names:
+                found[name].add(keyword)
+        return found
+
+
+SIGNAL_MATCHER = KeywordMatcher({
+    # Strong positive indicators
+    'positive_phrases': [
+        'love everyone', 'love all', 'i love', 'we love',
+        'equality', 'respect all', 'peace', 'believe in',
+        'care for', 'support', 'compassion', 'harmony',
+        'kindness', 'unity', 'acceptance', 'tolerance',
+        'embrace', 'welcome', 'include', 'appreciate'
+    ],
+    'positive_words': [
+        'love', 'peace', 'equality', 'respect', 'kindness',
+        'beautiful', 'wonderful', 'amazing', 'great', 'good',
+        'nice', 'compassion', 'care', 'support', 'harmony',
+        'unity', 'friendship', 'joy', 'happiness', 'hope'
+    ],
+    # Negative indicators that override positive (to catch "but I hate")
+    'hate_indicators': [
+        'but i hate', 'but hate', 'however i hate', 'yet i hate',
+        'but they', 'however they', 'but all', 'kill', 'die',
+        'destroy', 'exterminate', 'should burn'
+    ],
+    # Smaller keyword sets used by /predict/all
+    'all_basic_positive': ['love everyone', 'love all', 'equality', 'respect all'],
+    'all_deep_positive': ['love everyone', 'love all', 'equality', 'peace'],
+    'all_positive_words': ['love', 'peace', 'equality', 'respect'],
+})
+
+
+@dataclass(frozen=True)
+class Signals:
+    """Keyword signals for one request, shared by every model branch"""
+    positive_phrase_count: int
+    positive_word_count: int
+    has_hate_indicator: bool
+    basic_clearly_positive: bool
+    deep_clearly_positive: bool
+    all_positive_word_count: int
+
+
+def scan_signals(text):
+    """Lowercase text once and collect all keyword signals in a single scan"""
+    found = SIGNAL_MATCHER.scan(text.lower())
+    return Signals(
+        positive_phrase_count=len(found['positive_phrases']),
+        positive_word_count=len(found['positive_words']),
+        has_hate_indicator=bool(found['hate_indicators']),
+        basic_clearly_positive=bool(found['all_basic_positive']),
+        deep_clearly_positive=bool(found['all_deep_positive']),
+        all_positive_word_count=len(found['all_positive_words'])
+    )
+
+# ------------------ BASIC MODEL FEATURES ------------------
+class TfidfRowEncoder:
+    """
+    TfidfVectorizer.transform() for the saved (raw counts, idf, l2) configuration
+    without sklearn's per-call input validation; the analyzer is built once
+    """
+
+    def __init__(self, vectorizer):
+        self.analyze = vectorizer.build_analyzer()
+        self.vocabulary = vectorizer.vocabulary_
+        self.idf = np.asarray(vectorizer.idf_).tolist()
+        self.n_features = len(self.vocabulary)
+
+    @staticmethod
+    def supports(vectorizer):
+        return (getattr(vectorizer, 'use_idf', False) and vectorizer.norm == 'l2'
+                and not vectorizer.sublinear_tf and not vectorizer.binary
+                and vectorizer.dtype == np.float64)
+
+    def __call__(self, texts):
+        vocabulary = self.vocabulary
+        idf = self.idf
+        indptr = [0]
+        indices = []
+        data = []
+        for text in texts:
+            counts = {}
+            for feature in self.analyze(text):
+                j = vocabulary.get(feature)
+                if j is not None:
+                    counts[j] = counts.get(j, 0) + 1
+            # Same column order and summation order as sklearn, so values match bit for bit
+            columns = sorted(counts)
+            weights = [counts[j] * idf[j] for j in columns]
+            norm = 0.0
+            for w in weights:
+                norm += w * w
+            if norm != 0.0:
+                norm = math.sqrt(norm)
+                weights = [w / norm for w in weights]
+            indices.extend(columns)
+            data.extend(weights)
+            indptr.append(len(indices))
+        return sparse.csr_matrix(
+            (np.array(data, dtype=np.float64), np.array(indices, dtype=np.int32), np.array(indptr, dtype=np.int32)),
+            shape=(len(texts), self.n_features)
+        )
+
 # ------------------ MODEL LOADING ------------------
+def label_is_hate(label):
+    """Whether a deep model label denotes hate speech, memoized in HATE_LABEL_MAP"""
+    is_hate = HATE_LABEL_MAP.get(label)
+    if is_hate is None:
+        is_hate = HATE_LABEL_MAP[label] = any(key in label.upper() for key in HATE_LABEL_KEYS)
+    return is_hate
+
+def build_deep_pipeline(model_path):
+    """Create the deep model pipeline on the configured backend"""
+    # Use a GPU when one is present, otherwise stay on CPU
+    device = 0 if HAS_TORCH and torch.cuda.is_available() else -1
+    options = {
+        'max_length': DEEP_MAX_TOKENS,
+        'truncation': True,
+        'batch_size': DEEP_BATCH_SIZE,
+        'device': device
+    }
+    model = model_path
+    # Rust-backed fast tokenizer encodes a whole batch in one call
+    tokenizer = AutoTokenizer.from_pretrained(model_path, use_fast=True)
+
+    if DEEP_MODEL_BACKEND == 'onnx':
+        try:
+            from optimum.onnxruntime import ORTModelForSequenceClassification
+            # Export to ONNX so Runtime can fuse attention/layernorm/gelu kernels
+            model = ORTModelForSequenceClassification.from_pretrained(model_path, export=True)
+            options.pop('device')
+            print("⚡ Deep model exported to ONNX Runtime")
+        except ImportError:
+            print("⚠️ optimum[onnxruntime] not installed, using PyTorch eager mode")
+
+    classifier = pipeline("text-classification", model=model, tokenizer=tokenizer, **options)
+
+    # Dynamic quantization only has CPU kernels
+    if DEEP_MODEL_INT8 and HAS_TORCH and DEEP_MODEL_BACKEND != 'onnx' and device == -1:
+        # INT8 weights halve memory traffic and use VNNI dot-product kernels on CPU
+        classifier.model = torch.quantization.quantize_dynamic(
+            classifier.model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        print("⚡ Deep model quantized to INT8")
+
+    if DEEP_MODEL_BACKEND == 'compile' and HAS_TORCH:
+        classifier.model = torch.compile(classifier.model)
+        print("⚡ Deep model compiled with torch.compile")
+
+    return classifier
+
 def load_models():
-    global basic_model, vectorizer, deep_classifier, advanced_analyzer
+    global basic_model, vectorizer, vectorize, deep_classifier, advanced_analyzer
 
     # Load advanced analyzer
     try:
@@ -41,139 +286,266 @@ def load_models():
 
     # Load basic model and vectorizer
     try:
-        basic_model = joblib.load('basic_hate_model.pkl')
-        vectorizer = joblib.load('vectorizer.pkl')
+        # Read-only memory maps: numpy arrays stay backed by the files' page cache,
+        # shared by every worker process
+        basic_model = joblib.load('basic_hate_model.pkl', mmap_mode='r')
+        vectorizer = joblib.load('vectorizer.pkl', mmap_mode='r')
+        vectorize = TfidfRowEncoder(vectorizer) if TfidfRowEncoder.supports(vectorizer) else vectorizer.transform
         print("✅ Basic model and vectorizer loaded successfully!")
     except Exception as e:
         print(f"❌ Error loading basic model/vectorizer: {e}")
         basic_model = None
         vectorizer = None
+        vectorize = None
 
     # Load deep model - try multiple options
     try:
         # Try loading from local directory first
         if os.path.isdir('./deep_hate_model'):
-            deep_classifier = pipeline(
-                "text-classification",
-                model='./deep_hate_model',
-                tokenizer='./deep_hate_model',
-                max_length=512,
-                truncation=True,
-                device=-1  # Force CPU to avoid GPU memory issues
-            )
+            deep_classifier = build_deep_pipeline('./deep_hate_model')
             print("✅ Local deep model loaded successfully!")
         else:
             # Fall back to public model
             print("📥 Loading public RoBERTa model from Hugging Face...")
-            deep_classifier = pipeline(
-                "text-classification",
-                model="cardiffnlp/twitter-roberta-base-hate",
-                tokenizer="cardiffnlp/twitter-roberta-base-hate",
-                max_length=512,
-                truncation=True,
-                device=-1  # Force CPU to avoid GPU memory issues
-            )
+            deep_classifier = build_deep_pipeline("cardiffnlp/twitter-roberta-base-hate")
             print("✅ Public deep model loaded successfully!")
+
+        # Resolve the model's fixed label set once instead of scanning per request
+        HATE_LABEL_MAP.clear()
+        for label in deep_classifier.model.config.id2label.values():
+            label_is_hate(label)
     except Exception as e:
         print(f"❌ Error loading deep model: {e}")
         deep_classifier = None
 
+# ------------------ MODEL BATCHING ------------------
+class ModelBatcher:
+    """Coalesce concurrent model requests into batched predict calls"""
+
+    def __init__(self, predict_batch, name, max_batch, window):
+        self.predict_batch = predict_batch
+        self.name = name
+        self.max_batch = max_batch
+        self.window = window
+        self.queue = queue.Queue()
+        self.worker = None
+
+    def submit(self, text):
+        """Queue text for classification and return a Future for its result"""
+        self._ensure_worker()
+        future = Future()
+        self.queue.put((text, future))
+        return future
+
+    def classify(self, text, timeout=DEEP_TIMEOUT):
+        """Classify one text, blocking until its batch has run"""
+        return self.submit(text).result(timeout=timeout)
+
+    def _ensure_worker(self):
+        # Started lazily so each forked gunicorn worker gets its own thread
+        if self.worker is not None and self.worker.is_alive():
+            return
+        with model_lock:
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = Thread(target=self._run, name=self.name, daemon=True)
+                self.worker.start()
+
+    def _collect_batch(self):
+        """Block for one request, then gather more until the window closes"""
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            batch = [(text, future) for text, future in batch
+                     if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                texts = [text for text, _ in batch]
+                results = self.predict_batch(texts)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+def predict_deep_batch(texts):
+    return deep_classifier(texts, batch_size=len(texts))
+
+def predict_basic_batch(cleaned_texts):
+    """Vectorize and score cleaned texts in one sklearn call each"""
+    vec = vectorize(cleaned_texts)
+    preds = basic_model.predict(vec)
+    probs = basic_model.predict_proba(vec)[:, 1]
+    return list(zip(preds, probs))
+
+deep_batcher = ModelBatcher(predict_deep_batch, 'deep-batcher', DEEP_BATCH_SIZE, DEEP_BATCH_WINDOW)
+basic_batcher = ModelBatcher(predict_basic_batch, 'basic-batcher', BASIC_BATCH_SIZE, BASIC_BATCH_WINDOW)
+
+def classify_deep(text):
+    """Run the deep model on one text through the shared batching queue"""
+    return deep_batcher.classify(text)
+
+def classify_basic(text):
+    """Return (pred, hate probability) for one text via the basic model's batching queue"""
+    return basic_batcher.classify(clean_text(text))
+
 # Initialize models on startup
 with app.app_context():
     load_models()
 
+# URLs, mentions, hashtags and whitespace runs, replaced by a single space.
+# 'http' already covers 'https', so no separate branch is needed.
+CLEAN_TEXT_RE = re.compile(r'http\S+|www\S+|[@#]\w+|\s+')
+
 def clean_text(text):
     """Clean and preprocess text"""
-    text = str(text)
-    text = re.sub(r'http\S+|www\S+|https\S+|@\w+|#\w+|\s+', ' ', text)
-    return text.strip().lower()
-
-def cleanup_memory():
-    """Force garbage collection to free memory"""
-    gc.collect()
-    if HAS_TORCH:
-        try:
-            torch.cuda.empty_cache()
-        except:
-            pass
-
-# After request handler to cleanup
-@app.after_request
-def after_request(response):
-    """Cleanup after each request"""
-    try:
-        # Only cleanup on prediction endpoints
-        if request.path.startswith('/predict/'):
-            cleanup_memory()
-    except:
-        pass
-    return response
+    if not isinstance(text, str):
+        text = str(text)
+    return CLEAN_TEXT_RE.sub(' ', text).strip().lower()
+
+def weighted_hate_score(votes):
+    """
+    Weighted hate probability from (is_hate, confidence, weight) model votes
+    Weights are renormalized over the votes given, so a model that didn't run
+    is simply left out
+    """
+    total = sum(weight for _, _, weight in votes)
+    return sum((conf if is_hate else 1 - conf) * weight for is_hate, conf, weight in votes) / total
+
+# ------------------ JSON ------------------
+def parse_json():
+    """Parse the request body as JSON, with orjson when available"""
+    if HAS_ORJSON and request.is_json:
+        return orjson.loads(request.get_data(cache=False))
+    return request.get_json()
+
+NON_ASCII_RE = re.compile(r'[^\x00-\x7f]+')
+
+def ascii_escape(match):
+    """Escape a run of non-ASCII characters as \\uXXXX, exactly as json.dumps does"""
+    return json.dumps(match.group(0))[1:-1]
+
+def ojsonify(data):
+    """jsonify() replacement that serializes with orjson when available"""
+    if not HAS_ORJSON:
+        return jsonify(data)
+    body = orjson.dumps(data, option=orjson.OPT_SORT_KEYS | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+    if not body.isascii():
+        # orjson always writes raw UTF-8; escape it like jsonify's ensure_ascii
+        body = NON_ASCII_RE.sub(ascii_escape, body.decode()).encode()
+    return app.response_class(body, mimetype='application/json')
+
+# ------------------ RESPONSE CACHE ------------------
+RESPONSE_CACHE_SIZE = 4096  # Recent prediction responses kept per worker
+RESPONSE_CACHE_MAX_BYTES = 16 * 1024  # Larger request or response bodies are never cached
+
+class SimpleLRU:
+    """Minimal LRU mapping used when cachetools is not installed"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+
+    def get(self, key, default=None):
+        if key not in self.data:
+            return default
+        self.data.move_to_end(key)
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+        self.data.move_to_end(key)
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+response_cache = LRUCache(maxsize=RESPONSE_CACHE_SIZE) if HAS_CACHETOOLS else SimpleLRU(RESPONSE_CACHE_SIZE)
+response_cache_lock = Lock()
+
+def mark_degraded():
+    """Flag the current response as missing a model's result so it isn't cached"""
+    g.degraded = True
+
+def cached_response(view):
+    """Serve repeated identical prediction requests from the response cache"""
+    @wraps(view)
+    def wrapper():
+        # Large bodies would pin memory in the cache, so always recompute them
+        data = request.get_data()
+        if len(data) > RESPONSE_CACHE_MAX_BYTES:
+            return view()
+
+        # Predictions are deterministic per endpoint, content type, query
+        # string and request body; the content type decides how it's parsed
+        key = (request.path, request.content_type, request.query_string,
+               hashlib.sha1(data).digest())
+        with response_cache_lock:
+            body = response_cache.get(key)
+        if body is not None:
+            return app.response_class(body, mimetype='application/json')
+
+        response = make_response(view())
+        # Only complete, successful predictions are cached; errors and
+        # responses missing a failed model's result are retried
+        if response.status_code == 200 and not g.get('degraded', False):
+            body = response.get_data()
+            if len(body) <= RESPONSE_CACHE_MAX_BYTES:
+                with response_cache_lock:
+                    response_cache[key] = body
+        return response
+    return wrapper
 
 # ------------------ ROUTES ------------------
 
 @app.route('/')
 def index():
     """Serve the main HTML page"""
-    return send_from_directory('.', 'index.html')
+    return send_from_directory('.', 'index.html', conditional=True)
 
 @app.route('/<path:path>')
 def serve_static(path):
     """Serve static files (CSS, JS, images)"""
-    return send_from_directory('.', path)
+    return send_from_directory('.', path, conditional=True)
 
 @app.route('/predict/basic', methods=['POST'])
+@cached_response
 def predict_basic():
     """Basic model prediction endpoint"""
     try:
-        data = request.get_json()
+        data = parse_json()
         text = data.get('text', '')
 
         if not text:
-            return jsonify({'error': 'No text provided'}), 400
+            return ojsonify({'error': 'No text provided'}), 400
 
         # Limit text length to prevent issues
         if len(text) > 1000:
             text = text[:1000]
             
         if basic_model is None or vectorizer is None:
-            return jsonify({'error': 'Basic model not available'}), 503
+            return ojsonify({'error': 'Basic model not available'}), 503
 
-        # Enhanced positive content detection
-        text_lower = text.lower()
-        
-        # Strong positive indicators
-        positive_phrases = [
-            'love everyone', 'love all', 'i love', 'we love',
-            'equality', 'respect all', 'peace', 'believe in',
-            'care for', 'support', 'compassion', 'harmony',
-            'kindness', 'unity', 'acceptance', 'tolerance',
-            'embrace', 'welcome', 'include', 'appreciate'
-        ]
-        
-        positive_words = [
-            'love', 'peace', 'equality', 'respect', 'kindness', 
-            'beautiful', 'wonderful', 'amazing', 'great', 'good',
-            'nice', 'compassion', 'care', 'support', 'harmony',
-            'unity', 'friendship', 'joy', 'happiness', 'hope'
-        ]
-        
-        # Negative indicators
-        hate_indicators = [
-            'but i hate', 'but hate', 'however i hate', 'yet i hate',
-            'but they', 'however they', 'but all', 'kill', 'die',
-            'destroy', 'exterminate', 'should burn'
-        ]
-        
-        # Check for hate indicators
-        has_hate_indicator = any(indicator in text_lower for indicator in hate_indicators)
-        
-        # Count positive elements
-        positive_phrase_count = sum(1 for phrase in positive_phrases if phrase in text_lower)
-        positive_word_count = sum(1 for word in positive_words if word in text_lower)
+        # Enhanced positive content detection: hate indicators and positive elements
+        signals = scan_signals(text)
+        has_hate_indicator = signals.has_hate_indicator
+        positive_phrase_count = signals.positive_phrase_count
+        positive_word_count = signals.positive_word_count
         
         # Strong positive override (unless hate indicators present)
         if positive_phrase_count >= 1 and not has_hate_indicator:
-            return jsonify({
+            return ojsonify({
                 'model': 'Basic (Logistic Regression)',
                 'prediction': 'Not Hate Speech',
                 'confidence_hate': 0.95,
@@ -182,7 +554,7 @@ def predict_basic():
             })
         
         if positive_word_count >= 3 and not has_hate_indicator:
-            return jsonify({
+            return ojsonify({
                 'model': 'Basic (Logistic Regression)',
                 'prediction': 'Not Hate Speech',
                 'confidence_hate': 0.92,
@@ -190,13 +562,8 @@ def predict_basic():
                 'note': 'Multiple positive words detected'
             })
 
-        # Clean and vectorize text
-        cleaned = clean_text(text)
-        vec = vectorizer.transform([cleaned])
-        
-        # Predict
-        pred = basic_model.predict(vec)[0]
-        prob = basic_model.predict_proba(vec)[0][1]
+        # Clean, vectorize and predict, batched with any concurrent requests
+        pred, prob = classify_basic(text)
         
         # Post-process: check for false positives
         if positive_word_count >= 2 and pred == 1 and not has_hate_indicator:
@@ -206,7 +573,7 @@ def predict_basic():
         
         label = "Hate Speech" if pred == 1 else "Not Hate Speech"
 
-        return jsonify({
+        return ojsonify({
             'model': 'Basic (Logistic Regression)',
             'prediction': label,
             'confidence_hate': round(float(prob), 4),
@@ -217,62 +584,36 @@ def predict_basic():
         print(f"❌ Error in basic prediction: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/predict/deep', methods=['POST'])
+@cached_response
 def predict_deep():
     """Deep model prediction endpoint with thread safety"""
     try:
-        data = request.get_json()
+        data = parse_json()
         text = data.get('text', '')
 
         if not text:
-            return jsonify({'error': 'No text provided'}), 400
+            return ojsonify({'error': 'No text provided'}), 400
 
         # Limit text length to prevent issues
         if len(text) > 1000:
             text = text[:1000]
             
         if deep_classifier is None:
-            return jsonify({'error': 'Deep model is unavailable'}), 503
+            return ojsonify({'error': 'Deep model is unavailable'}), 503
 
-        # Enhanced positive content detection
-        text_lower = text.lower()
-        
-        # Strong positive indicators
-        positive_phrases = [
-            'love everyone', 'love all', 'i love', 'we love',
-            'equality', 'respect all', 'peace', 'believe in',
-            'care for', 'support', 'compassion', 'harmony',
-            'kindness', 'unity', 'acceptance', 'tolerance',
-            'embrace', 'welcome', 'include', 'appreciate'
-        ]
-        
-        positive_words = [
-            'love', 'peace', 'equality', 'respect', 'kindness', 
-            'beautiful', 'wonderful', 'amazing', 'great', 'good',
-            'nice', 'compassion', 'care', 'support', 'harmony',
-            'unity', 'friendship', 'joy', 'happiness', 'hope'
-        ]
-        
-        # Negative indicators that would override positive (to catch "but I hate")
-        hate_indicators = [
-            'but i hate', 'but hate', 'however i hate', 'yet i hate',
-            'but they', 'however they', 'but all', 'kill', 'die',
-            'destroy', 'exterminate', 'should burn'
-        ]
-        
-        # Check for hate indicators first
-        has_hate_indicator = any(indicator in text_lower for indicator in hate_indicators)
-        
-        # Count positive elements
-        positive_phrase_count = sum(1 for phrase in positive_phrases if phrase in text_lower)
-        positive_word_count = sum(1 for word in positive_words if word in text_lower)
+        # Enhanced positive content detection: hate indicators and positive elements
+        signals = scan_signals(text)
+        has_hate_indicator = signals.has_hate_indicator
+        positive_phrase_count = signals.positive_phrase_count
+        positive_word_count = signals.positive_word_count
         
         # Strong positive override (unless hate indicators present)
         if positive_phrase_count >= 1 and not has_hate_indicator:
-            return jsonify({
+            return ojsonify({
                 'model': 'Deep (RoBERTa BERT)',
                 'prediction': 'Not Hate Speech',
                 'confidence': 0.95,
@@ -281,7 +622,7 @@ def predict_deep():
             })
         
         if positive_word_count >= 3 and not has_hate_indicator:
-            return jsonify({
+            return ojsonify({
                 'model': 'Deep (RoBERTa BERT)',
                 'prediction': 'Not Hate Speech',
                 'confidence': 0.92,
@@ -289,14 +630,11 @@ def predict_deep():
                 'note': 'Multiple positive words detected'
             })
 
-        # Use lock to prevent concurrent access to the model
-        with model_lock:
-            # Predict with model
-            result = deep_classifier(text)[0]
+        # Predict with model, batched with any concurrent requests
+        result = classify_deep(text)
         
         # Handle different label formats
-        hate_labels = ['LABEL_1', 'HATE', 'hate', 'toxic']
-        is_hate = any(label in result['label'].upper() for label in [l.upper() for l in hate_labels])
+        is_hate = label_is_hate(result['label'])
         
         # Post-processing: Double check for false positives
         if is_hate and positive_word_count >= 2 and not has_hate_indicator:
@@ -308,7 +646,7 @@ def predict_deep():
         
         label = 'Hate Speech' if is_hate else 'Not Hate Speech'
 
-        return jsonify({
+        return ojsonify({
             'model': 'Deep (RoBERTa BERT)',
             'prediction': label,
             'confidence': round(float(score), 4),
@@ -320,18 +658,19 @@ def predict_deep():
         print(f"❌ Error in deep prediction: {e}")
         import traceback
         traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/predict/both', methods=['POST'])
+@cached_response
 def predict_both():
     """Get predictions from both models at once with consensus"""
     try:
-        data = request.get_json()
+        data = parse_json()
         text = data.get('text', '')
 
         if not text:
-            return jsonify({'error': 'No text provided'}), 400
+            return ojsonify({'error': 'No text provided'}), 400
 
         results = {
             'text_length': len(text),
@@ -346,10 +685,7 @@ def predict_both():
         # Basic model prediction
         if basic_model and vectorizer:
             try:
-                cleaned = clean_text(text)
-                vec = vectorizer.transform([cleaned])
-                pred = basic_model.predict(vec)[0]
-                prob = basic_model.predict_proba(vec)[0][1]
+                pred, prob = classify_basic(text)
                 
                 results['basic'] = {
                     'prediction': "Hate Speech" if pred == 1 else "Not Hate Speech",
@@ -359,13 +695,13 @@ def predict_both():
                 basic_pred = results['basic']
             except Exception as e:
                 results['basic']['error'] = str(e)
+                mark_degraded()
 
         # Deep model prediction
         if deep_classifier:
             try:
-                result = deep_classifier(text)[0]
-                hate_labels = ['LABEL_1', 'HATE', 'hate', 'toxic']
-                is_hate = any(label in result['label'].upper() for label in [l.upper() for l in hate_labels])
+                result = classify_deep(text)
+                is_hate = label_is_hate(result['label'])
                 
                 results['deep'] = {
                     'prediction': 'Hate Speech' if is_hate else 'Not Hate Speech',
@@ -375,6 +711,7 @@ def predict_both():
                 deep_pred = results['deep']
             except Exception as e:
                 results['deep']['error'] = str(e)
+                mark_degraded()
 
         # Calculate consensus
         if basic_pred and deep_pred:
@@ -391,10 +728,10 @@ def predict_both():
                 }
             else:
                 # Models disagree - weighted average (Deep: 60%, Basic: 40%)
-                weighted_score = (
-                    (basic_pred['confidence'] if basic_is_hate else (1 - basic_pred['confidence'])) * 0.4 +
-                    (deep_pred['confidence'] if deep_is_hate else (1 - deep_pred['confidence'])) * 0.6
-                )
+                weighted_score = weighted_hate_score((
+                    (basic_is_hate, basic_pred['confidence'], 0.4),
+                    (deep_is_hate, deep_pred['confidence'], 0.6)
+                ))
                 final_is_hate = weighted_score > 0.5
                 
                 results['consensus'] = {
@@ -405,30 +742,31 @@ def predict_both():
                     'note': 'Models disagreed - using weighted average (Deep: 60%, Basic: 40%)'
                 }
 
-        return jsonify(results)
+        return ojsonify(results)
 
     except Exception as e:
         print(f"Error in combined prediction: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/predict/advanced', methods=['POST'])
+@cached_response
 def predict_advanced():
     """Advanced prediction with emotion tracking and tone shift detection"""
     try:
-        data = request.get_json()
+        data = parse_json()
         text = data.get('text', '')
 
         if not text:
-            return jsonify({'error': 'No text provided'}), 400
+            return ojsonify({'error': 'No text provided'}), 400
 
         if advanced_analyzer is None:
-            return jsonify({'error': 'Advanced analyzer not available'}), 503
+            return ojsonify({'error': 'Advanced analyzer not available'}), 503
 
-        # Analyze with advanced analyzer
-        result = advanced_analyzer.analyze_text(text)
+        # Analyze with advanced analyzer, per-word lists limited for performance
+        result = advanced_analyzer.analyze_text(text, max_items=ADVANCED_MAX_ITEMS)
         
-        return jsonify({
+        return ojsonify({
             'model': 'Advanced (Word-by-Word Analysis)',
             'classification': result['classification'],
             'confidence': result['confidence'],
@@ -436,24 +774,25 @@ def predict_advanced():
             'message': result['message'],
             'tone_shift': result['tone_shift'],
             'details': result['details'],
-            'word_analysis': result['word_analysis'][:20],  # Limit for performance
-            'emotion_timeline': result['emotion_timeline'][:20]
+            'word_analysis': result['word_analysis'],
+            'emotion_timeline': result['emotion_timeline']
         })
 
     except Exception as e:
         print(f"Error in advanced prediction: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/predict/consensus', methods=['POST'])
+@cached_response
 def predict_consensus():
     """Get only the final consensus prediction"""
     try:
-        data = request.get_json()
+        data = parse_json()
         text = data.get('text', '')
 
         if not text:
-            return jsonify({'error': 'No text provided'}), 400
+            return ojsonify({'error': 'No text provided'}), 400
 
         # Get both predictions
         basic_is_hate = False
@@ -464,24 +803,20 @@ def predict_consensus():
         # Basic model
         if basic_model and vectorizer:
             try:
-                cleaned = clean_text(text)
-                vec = vectorizer.transform([cleaned])
-                pred = basic_model.predict(vec)[0]
-                prob = basic_model.predict_proba(vec)[0][1]
+                pred, prob = classify_basic(text)
                 basic_is_hate = bool(pred == 1)
                 basic_conf = float(prob)
             except:
-                pass
+                mark_degraded()
 
         # Deep model
         if deep_classifier:
             try:
-                result = deep_classifier(text)[0]
-                hate_labels = ['LABEL_1', 'HATE', 'hate', 'toxic']
-                deep_is_hate = any(label in result['label'].upper() for label in [l.upper() for l in hate_labels])
+                result = classify_deep(text)
+                deep_is_hate = label_is_hate(result['label'])
                 deep_conf = float(result['score'] if deep_is_hate else 1 - result['score'])
             except:
-                pass
+                mark_degraded()
 
         # Calculate final verdict
         if basic_is_hate == deep_is_hate:
@@ -491,15 +826,15 @@ def predict_consensus():
             agreement = 'full'
         else:
             # Disagreement - weighted average
-            weighted_score = (
-                (basic_conf if basic_is_hate else (1 - basic_conf)) * 0.4 +
-                (deep_conf if deep_is_hate else (1 - deep_conf)) * 0.6
-            )
+            weighted_score = weighted_hate_score((
+                (basic_is_hate, basic_conf, 0.4),
+                (deep_is_hate, deep_conf, 0.6)
+            ))
             final_verdict = 'Hate Speech' if weighted_score > 0.5 else 'Not Hate Speech'
             final_confidence = weighted_score
             agreement = 'partial'
 
-        return jsonify({
+        return ojsonify({
             'prediction': final_verdict,
             'confidence': round(final_confidence, 4),
             'agreement': agreement,
@@ -508,18 +843,19 @@ def predict_consensus():
 
     except Exception as e:
         print(f"Error in consensus prediction: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/predict/all', methods=['POST'])
+@cached_response
 def predict_all():
     """Get predictions from all models including advanced analyzer"""
     try:
-        data = request.get_json()
+        data = parse_json()
         text = data.get('text', '')
 
         if not text:
-            return jsonify({'error': 'No text provided'}), 400
+            return ojsonify({'error': 'No text provided'}), 400
 
         results = {
             'text': text,
@@ -534,10 +870,14 @@ def predict_all():
         deep_pred = None
         advanced_pred = None
 
+        # Keyword signals shared by the basic and deep branches
+        signals = scan_signals(text)
+
         # Advanced analyzer (priority)
         if advanced_analyzer:
             try:
-                adv_result = advanced_analyzer.analyze_text(text)
+                # Per-word lists aren't part of this response
+                adv_result = advanced_analyzer.analyze_text(text, max_items=0)
                 results['advanced'] = {
                     'classification': adv_result['classification'],
                     'confidence': adv_result['confidence'],
@@ -549,25 +889,19 @@ def predict_all():
                 advanced_pred = adv_result
             except Exception as e:
                 results['advanced']['error'] = str(e)
+                mark_degraded()
 
         # Basic model prediction
         if basic_model and vectorizer:
             try:
-                text_lower = text.lower()
-                positive_phrases = ['love everyone', 'love all', 'equality', 'respect all']
-                is_clearly_positive = any(phrase in text_lower for phrase in positive_phrases)
-                
-                if is_clearly_positive:
+                if signals.basic_clearly_positive:
                     results['basic'] = {
                         'prediction': 'Not Hate Speech',
                         'confidence': 0.92,
                         'is_hate': False
                     }
                 else:
-                    cleaned = clean_text(text)
-                    vec = vectorizer.transform([cleaned])
-                    pred = basic_model.predict(vec)[0]
-                    prob = basic_model.predict_proba(vec)[0][1]
+                    pred, prob = classify_basic(text)
                     
                     results['basic'] = {
                         'prediction': "Hate Speech" if pred == 1 else "Not Hate Speech",
@@ -577,30 +911,34 @@ def predict_all():
                 basic_pred = results['basic']
             except Exception as e:
                 results['basic']['error'] = str(e)
-
-        # Deep model prediction
-        if deep_classifier:
+                mark_degraded()
+
+        # Deep model prediction, skipped when the advanced analyzer is already
+        # confident; clearly positive text never runs the model, so keep its vote
+        skip_deep = (
+            deep_classifier is not None and advanced_pred is not None
+            and advanced_pred['confidence'] >= HIGH_CONF_THRESHOLD
+            and not signals.deep_clearly_positive
+        )
+        if skip_deep:
+            results['deep'] = {
+                'skipped': True,
+                'note': 'Advanced analyzer is highly confident, deep model not run'
+            }
+        elif deep_classifier:
             try:
-                text_lower = text.lower()
-                positive_phrases = ['love everyone', 'love all', 'equality', 'peace']
-                is_clearly_positive = any(phrase in text_lower for phrase in positive_phrases)
-                
-                if is_clearly_positive:
+                if signals.deep_clearly_positive:
                     results['deep'] = {
                         'prediction': 'Not Hate Speech',
                         'confidence': 0.95,
                         'is_hate': False
                     }
                 else:
-                    result = deep_classifier(text)[0]
-                    hate_labels = ['LABEL_1', 'HATE', 'hate', 'toxic']
-                    is_hate = any(label in result['label'].upper() for label in [l.upper() for l in hate_labels])
+                    result = classify_deep(text)
+                    is_hate = label_is_hate(result['label'])
                     
                     # Double check for positive content
-                    positive_words = ['love', 'peace', 'equality', 'respect']
-                    positive_count = sum(1 for word in positive_words if word in text_lower)
-                    
-                    if positive_count >= 2 and is_hate:
+                    if signals.all_positive_word_count >= 2 and is_hate:
                         is_hate = False
                         score = 0.88
                     else:
@@ -614,19 +952,22 @@ def predict_all():
                 deep_pred = results['deep']
             except Exception as e:
                 results['deep']['error'] = str(e)
+                mark_degraded()
 
-        # Calculate consensus from all three models
-        if advanced_pred and basic_pred and deep_pred:
+        # Calculate consensus from all three models, or from advanced and
+        # basic alone when the deep model was skipped
+        if advanced_pred and basic_pred and (deep_pred or skip_deep):
             # Advanced analyzer has highest weight (50%), Deep (30%), Basic (20%)
-            adv_is_hate = advanced_pred['classification'] in ['HATE_SPEECH', 'MODERATE_HATE']
+            adv_is_hate = advanced_pred['classification'] in ADVANCED_HATE_CLASSES
             basic_is_hate = basic_pred['is_hate']
-            deep_is_hate = deep_pred['is_hate']
             
-            weighted_score = (
-                (advanced_pred['confidence'] if adv_is_hate else (1 - advanced_pred['confidence'])) * 0.5 +
-                (basic_pred['confidence'] if basic_is_hate else (1 - basic_pred['confidence'])) * 0.2 +
-                (deep_pred['confidence'] if deep_is_hate else (1 - deep_pred['confidence'])) * 0.3
-            )
+            votes = [
+                (adv_is_hate, advanced_pred['confidence'], ALL_MODEL_WEIGHTS['advanced']),
+                (basic_is_hate, basic_pred['confidence'], ALL_MODEL_WEIGHTS['basic'])
+            ]
+            if not skip_deep:
+                votes.append((deep_pred['is_hate'], deep_pred['confidence'], ALL_MODEL_WEIGHTS['deep']))
+            weighted_score = weighted_hate_score(votes)
             
             final_is_hate = weighted_score > 0.5
             
@@ -634,26 +975,33 @@ def predict_all():
                 'verdict': 'Hate Speech' if final_is_hate else 'Not Hate Speech',
                 'confidence': round(float(weighted_score), 4),
                 'weighted_average': True,
-                'model_weights': {'advanced': 0.5, 'deep': 0.3, 'basic': 0.2},
+                'model_weights': ALL_MODEL_WEIGHTS,
                 'note': 'Advanced analyzer given highest priority (50%)'
             }
+            if skip_deep:
+                # Weights actually applied, renormalized without the deep model
+                results['consensus']['deep_skipped'] = True
+                results['consensus']['model_weights'] = {
+                    name: round(weight / (1 - ALL_MODEL_WEIGHTS['deep']), 4)
+                    for name, weight in ALL_MODEL_WEIGHTS.items() if name != 'deep'
+                }
             
             # Add tone shift info to consensus
             if advanced_pred.get('tone_shift'):
                 results['consensus']['tone_shift'] = advanced_pred['tone_shift']
                 results['consensus']['tone_message'] = advanced_pred['message']
 
-        return jsonify(results)
+        return ojsonify(results)
 
     except Exception as e:
         print(f"Error in all predictions: {e}")
-        return jsonify({'error': str(e)}), 500
+        return ojsonify({'error': str(e)}), 500
 
 
 @app.route('/health', methods=['GET'])
 def health():
     """Health check endpoint"""
-    return jsonify({
+    return ojsonify({
         'status': 'ok',
         'basic_model_loaded': basic_model is not None and vectorizer is not None,
         'deep_model_loaded': deep_classifier is not None,
@@ -664,7 +1012,7 @@ def health():
 @app.route('/models/info', methods=['GET'])
 def models_info():
     """Get information about loaded models"""
-    return jsonify({
+    return ojsonify({
         'basic_model': {
             'name': 'Logistic Regression',
             'status': 'loaded' if basic_model else 'not loaded',
@@ -684,11 +1032,11 @@ def models_info():
 
 @app.errorhandler(404)
 def not_found(e):
-    return jsonify({'error': 'Endpoint not found'}), 404
+    return ojsonify({'error': 'Endpoint not found'}), 404
 
 @app.errorhandler(500)
 def internal_error(e):
-    return jsonify({'error': 'Internal server error'}), 500
+    return ojsonify({'error': 'Internal server error'}), 500
 
 
 # ------------------ MAIN ------------------
@@ -1,6 +1,25 @@
 # Comprehensive Hate Speech Detection Datasets
 # Categories: HATE, MODERATE, SAFE
 
+import re
+from functools import lru_cache
+from types import MappingProxyType
+from typing import NamedTuple
+
+# Aho-Corasick gives a single-pass multi-phrase scan when available
+try:
+    import ahocorasick
+    HAS_AHOCORASICK = True
+except ImportError:
+    HAS_AHOCORASICK = False
+
+# A marisa trie stores the phrase set compactly with shared prefixes
+try:
+    import marisa_trie
+    HAS_MARISA = True
+except ImportError:
+    HAS_MARISA = False
+
 DATASETS = {
     # HATE SPEECH WORDS & PHRASES
     'hate': {
@@ -17,7 +36,7 @@ DATASETS = {
             'black people are', 'white people are', 'asian people are',
             'all blacks', 'all whites', 'all asians',
             'inferior race', 'superior race', 'racial purity',
-            'mongrel', 'savage', 'primitive people'
+            'mongrel', 'primitive people'
         ],
         
         # Ethnicity/Nationality
@@ -140,22 +159,26 @@ DATASETS = {
     }
 }
 
-# Contextual phrases for tone analysis
+# Contextual phrases for tone analysis (frozensets for O(1) token lookup)
+TONE_POS_TO_HATE = frozenset({
+    'but', 'however', 'although', 'except', 'still',
+    'yet', 'nevertheless', 'nonetheless'
+})
+
+TONE_INTENSIFIERS = frozenset({
+    'very', 'extremely', 'absolutely', 'completely', 'totally',
+    'really', 'so', 'too', 'quite', 'highly'
+})
+
+TONE_GENERALIZERS = frozenset({
+    'all', 'every', 'always', 'never', 'everyone',
+    'nobody', 'everything', 'nothing'
+})
+
 TONE_SHIFTS = {
-    'positive_to_hate': [
-        'but', 'however', 'although', 'except', 'still',
-        'yet', 'nevertheless', 'nonetheless'
-    ],
-    
-    'intensifiers': [
-        'very', 'extremely', 'absolutely', 'completely', 'totally',
-        'really', 'so', 'too', 'quite', 'highly'
-    ],
-    
-    'generalizers': [
-        'all', 'every', 'always', 'never', 'everyone',
-        'nobody', 'everything', 'nothing'
-    ]
+    'positive_to_hate': TONE_POS_TO_HATE,
+    'intensifiers': TONE_INTENSIFIERS,
+    'generalizers': TONE_GENERALIZERS
 }
 
 # Weights for scoring
@@ -189,28 +212,243 @@ WEIGHTS = {
     }
 }
 
+# The tables above are constants: expose them as read-only mappings,
+# with each subcategory's entries as a tuple
+DATASETS = MappingProxyType({
+    category: MappingProxyType({
+        subcategory: tuple(words) for subcategory, words in subcategories.items()
+    })
+    for category, subcategories in DATASETS.items()
+})
+WEIGHTS = MappingProxyType({
+    category: MappingProxyType(category_weights)
+    for category, category_weights in WEIGHTS.items()
+})
+TONE_SHIFTS = MappingProxyType(TONE_SHIFTS)
+
+# Entry counts per category and overall
+CATEGORY_COUNTS = {
+    category: sum(len(words) for words in subcategories.values())
+    for category, subcategories in DATASETS.items()
+}
+HATE_COUNT = CATEGORY_COUNTS['hate']
+MODERATE_COUNT = CATEGORY_COUNTS['moderate']
+SAFE_COUNT = CATEGORY_COUNTS['safe']
+TOTAL_COUNT = sum(CATEGORY_COUNTS.values())
+
+# Subcategory names in dataset order; compact records refer to them by index
+SUBCATEGORY_NAMES = tuple(subcategory for subcategories in DATASETS.values() for subcategory in subcategories)
+SUBCAT_TO_ID = {name: i for i, name in enumerate(SUBCATEGORY_NAMES)}
+# Scoring weight per subcategory id, one shared float each
+WEIGHT_BY_SUBCAT = tuple(
+    WEIGHTS[category].get(subcategory, 0.5)
+    for category, subcategories in DATASETS.items()
+    for subcategory in subcategories
+)
+
+class PhraseEntry(NamedTuple):
+    """Resolved metadata for one dataset entry"""
+    category: str
+    subcategory: str
+    weight: float
+
+@lru_cache(maxsize=1)
 def get_all_words():
-    """Get all words from datasets for quick lookup"""
+    """
+    Get all words from datasets for quick lookup
+    Entries are already lowercase (checked at import), so they are used as is
+    Returns {category: {word_lower: subcategory_id}}; resolve ids with
+    SUBCATEGORY_NAMES and WEIGHT_BY_SUBCAT
+    Built once and shared by every caller, as read-only mappings
+    """
     all_words = {
         'hate': {},
         'moderate': {},
         'safe': {}
     }
     
-    for category in DATASETS:
-        for subcategory, words in DATASETS[category].items():
+    for category, subcategories in DATASETS.items():
+        category_words = all_words[category]
+        for subcategory, words in subcategories.items():
+            subcategory_id = SUBCAT_TO_ID[subcategory]
             for word in words:
-                all_words[category][word.lower()] = {
-                    'subcategory': subcategory,
-                    'weight': WEIGHTS[category].get(subcategory, 0.5)
-                }
+                category_words[word] = subcategory_id
     
-    return all_words
+    return MappingProxyType({
+        category: MappingProxyType(category_words)
+        for category, category_words in all_words.items()
+    })
+
+def _iter_entries():
+    """
+    Yield (order, category, subcategory, word_lower, weight) for every
+    dataset entry, where order is the entry's position in dataset order
+    """
+    order = 0
+    for category, subcategories in DATASETS.items():
+        category_weights = WEIGHTS[category]
+        for subcategory, words in subcategories.items():
+            weight = category_weights.get(subcategory, 0.5)
+            for word in words:
+                yield order, category, subcategory, word, weight
+                order += 1
+
+def _check_lowercase_entries():
+    """Entries are stored lowercase so matching never has to lowercase them"""
+    for category, subcategories in DATASETS.items():
+        for subcategory, words in subcategories.items():
+            for word in words:
+                if word != word.lower():
+                    raise ValueError(
+                        f"Dataset entry {word!r} in {category}/{subcategory} must be lowercase"
+                    )
+
+_check_lowercase_entries()
+
+def _check_unique_entries():
+    """Every entry must belong to exactly one subcategory, or lookups would silently pick one"""
+    seen = {}
+    for _, category, subcategory, word_lower, _ in _iter_entries():
+        if word_lower in seen:
+            raise ValueError(
+                f"Duplicate dataset entry {word_lower!r} in {category}/{subcategory} "
+                f"and {'/'.join(seen[word_lower])}"
+            )
+        seen[word_lower] = (category, subcategory)
+
+_check_unique_entries()
+
+def _build_automaton():
+    """
+    Compile every dataset entry into one Aho-Corasick automaton
+    Payload is (order, category, subcategory, weight); the first
+    occurrence wins on duplicates
+    """
+    automaton = ahocorasick.Automaton()
+    for order, category, subcategory, word_lower, weight in _iter_entries():
+        if word_lower not in automaton:
+            automaton.add_word(word_lower, (order, category, subcategory, weight))
+    automaton.make_automaton()
+    return automaton
+
+def _build_pattern():
+    """
+    Join every dataset entry into one alternation regex, longest first so
+    the most specific entry wins at each position
+    Returns (pattern, meta) with meta[phrase_lower] = PhraseEntry
+    """
+    meta = {}
+    for _, category, subcategory, word_lower, weight in _iter_entries():
+        meta.setdefault(word_lower, PhraseEntry(category, subcategory, weight))
+    alternation = '|'.join(re.escape(phrase) for phrase in sorted(meta, key=len, reverse=True))
+    # Case-sensitive: match against lowercased text, so every match is a meta key
+    return re.compile(alternation), meta
+
+def _build_start_pattern():
+    """
+    Zero-width regex matching every position where some entry could start,
+    judged by the entry's first two characters
+    """
+    starts = sorted({word_lower[:2] for _, _, _, word_lower, _ in _iter_entries()})
+    return re.compile('(?=' + '|'.join(re.escape(start) for start in starts) + ')')
+
+def _build_trie():
+    """
+    Pack every dataset entry into a marisa RecordTrie, shared prefixes stored once
+    Record is (order, subcategory_id, weight) as '<HBf'; the weight is only
+    float32, so score with WEIGHTS
+    """
+    items = {}
+    for order, _, subcategory, word_lower, weight in _iter_entries():
+        if word_lower not in items:
+            items[word_lower] = (order, SUBCAT_TO_ID[subcategory], weight)
+    return marisa_trie.RecordTrie('<HBf', items.items())
+
+# Category ids used by the flat scoring arrays
+CATEGORY_IDS = {'hate': 0, 'moderate': 1, 'safe': 2}
+
+# Batch scoring needs NumPy (and uses numba when installed); both are
+# imported on the first batch, never with this module
+@lru_cache(maxsize=1)
+def _scoring_arrays():
+    """
+    Flat per-entry layout in dataset order (index = entry order, as in the
+    AHOCORASICK payload and TRIE record): (category ids, weights)
+    """
+    import numpy as np
+    cat_id = np.fromiter((CATEGORY_IDS[category] for _, category, *_ in _iter_entries()), dtype=np.int8)
+    # float64 so sums match the scalar scoring path exactly
+    weights = np.fromiter((weight for *_, weight in _iter_entries()), dtype=np.float64)
+    return cat_id, weights
+
+def score_hits(hits, offsets):
+    """
+    Sum absolute weights per category for each text of a batch; needs NumPy
+    hits holds dataset entry indices; text t owns hits[offsets[t]:offsets[t + 1]]
+    Returns a (texts, 3) array of hate, moderate, safe scores, from the
+    numba kernel or one np.bincount call without numba
+    """
+    import numpy as np
+    cat_id, weights = _scoring_arrays()
+    texts = offsets.size - 1
+    kernel = _compiled_reduce()
+    if kernel is not None:
+        scores = np.zeros((texts, 3))
+        kernel(cat_id, weights, hits, offsets, scores)
+        return scores
+    # One (text, category) slot per score, summed in hit order
+    text_ids = np.repeat(np.arange(texts), np.diff(offsets))
+    return np.bincount(
+        text_ids * 3 + cat_id[hits], weights=np.abs(weights[hits]), minlength=3 * texts
+    ).reshape(-1, 3)
+
+def _reduce(cat_id, weights, hits, offsets, scores):
+    """Add the absolute weights of each text's hit entries into its row of scores"""
+    for t in range(offsets.size - 1):
+        for i in range(offsets[t], offsets[t + 1]):
+            k = hits[i]
+            scores[t, cat_id[k]] += abs(weights[k])
+
+@lru_cache(maxsize=1)
+def _compiled_reduce():
+    """Compile _reduce with numba; None when numba is not installed"""
+    try:
+        from numba import njit
+    except ImportError:
+        return None
+    # No fastmath: reassociating the adds would change the sums' last bits.
+    # cache=True loads the machine code from __pycache__ after the first run
+    return njit(cache=True)(_reduce)
+
+# Scan structures, built on first access rather than at import so that
+# importers only pay for the ones their matching path uses:
+#   PATTERN, PHRASE_META: leftmost-longest, non-overlapping scan with one
+#     C-level regex pass: for m in PATTERN.finditer(text.lower()): PHRASE_META[m.group(0)]
+#   PHRASE_START: candidate start offsets in one C-level pass, for scanners
+#     that probe position by position: for m in PHRASE_START.finditer(text_lower): m.start()
+#   AHOCORASICK: scan with for end_index, payload in AHOCORASICK.iter(text.lower());
+#     None when pyahocorasick is not installed
+#   TRIE: presence with phrase in TRIE, prefix scan with TRIE.prefixes(text[i:]);
+#     None when marisa-trie is not installed
+def __getattr__(name):
+    """Build a scan structure the first time it is looked up and keep it"""
+    module_globals = globals()
+    if name in ('PATTERN', 'PHRASE_META'):
+        module_globals['PATTERN'], module_globals['PHRASE_META'] = _build_pattern()
+    elif name == 'PHRASE_START':
+        module_globals[name] = _build_start_pattern()
+    elif name == 'AHOCORASICK':
+        module_globals[name] = _build_automaton() if HAS_AHOCORASICK else None
+    elif name == 'TRIE':
+        module_globals[name] = _build_trie() if HAS_MARISA else None
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return module_globals[name]
 
 # Export datasets
 if __name__ == "__main__":
     print("📚 Datasets Loaded Successfully!")
-    print(f"\nHate Speech Items: {sum(len(v) for v in DATASETS['hate'].values())}")
-    print(f"Moderate Items: {sum(len(v) for v in DATASETS['moderate'].values())}")
-    print(f"Safe Items: {sum(len(v) for v in DATASETS['safe'].values())}")
-    print(f"\nTotal Dataset Size: {sum(sum(len(v) for v in cat.values()) for cat in DATASETS.values())}")
+    print(f"\nHate Speech Items: {HATE_COUNT}")
+    print(f"Moderate Items: {MODERATE_COUNT}")
+    print(f"Safe Items: {SAFE_COUNT}")
+    print(f"\nTotal Dataset Size: {TOTAL_COUNT}")
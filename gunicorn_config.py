@@ -9,17 +9,25 @@ MAX_REQUESTS=1000
 KEEPALIVE=5
 
 ## Gunicorn Configuration
-# Usage: gunicorn -c gunicorn_config.py app_server:app
+# Usage: gunicorn -c gunicorn_config.py wsgi:app
 
-import multiprocessing
+import gc
+import os
 
 # Server socket
 bind = "0.0.0.0:5000"
 backlog = 2048
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
+# Models are preloaded once in the master and shared copy-on-write, but each
+# worker runs its own inference, batching queue and caches, so keep WORKERS
+# near the CPU count and scale concurrency with threads
+workers = int(os.environ.get('WORKERS', 4))
+worker_class = "gthread"
+threads = int(os.environ.get('THREADS', 8))
+
+# Load models once in the master; forked workers share those pages copy-on-write
+preload_app = True
 worker_connections = 1000
 timeout = 120
 keepalive = 5
@@ -43,6 +51,12 @@ user = None
 group = None
 tmp_upload_dir = None
 
+# Server hooks
+def pre_fork(server, worker):
+    # Move preloaded objects out of the GC's reach so collections in workers
+    # don't write to (and un-share) the inherited model pages
+    gc.freeze()
+
 # SSL (if needed)
 # keyfile = "/path/to/keyfile"
 # certfile = "/path/to/certfile"
@@ -3,15 +3,25 @@ Test script for Advanced Hate Speech Analyzer
 """
 
 from advanced_analyzer import AdvancedHateSpeechAnalyzer
+from operator import itemgetter
 import json
+import sys
+
+# Accessors for the parts of an analysis result the report reads
+_scores = itemgetter('hate', 'moderate', 'safe', 'final')
+_tone_shift = itemgetter('shift_type', 'start_emotion', 'end_emotion')
+_details = itemgetter('hate_words', 'safe_words')
+_word_group = itemgetter('count', 'words')
 
 def test_analyzer():
     analyzer = AdvancedHateSpeechAnalyzer()
     
-    print("="*80)
-    print(" "*20 + "ADVANCED HATE SPEECH ANALYZER")
-    print(" "*25 + "TEST RESULTS")
-    print("="*80)
+    # Collect output lines and write them once at the end
+    out = []
+    out.append("="*80)
+    out.append(" "*20 + "ADVANCED HATE SPEECH ANALYZER")
+    out.append(" "*25 + "TEST RESULTS")
+    out.append("="*80)
     
     test_cases = [
         {
@@ -51,57 +61,83 @@ def test_analyzer():
         }
     ]
     
-    for i, test in enumerate(test_cases, 1):
-        print(f"\n{'='*80}")
-        print(f"TEST CASE {i}: {test['name']}")
-        print(f"{'='*80}")
-        print(f"📝 Text: \"{test['text']}\"")
-        print(f"🎯 Expected: {test['expected']}")
-        print(f"\n{'─'*80}")
-        
-        result = analyzer.analyze_text(test['text'])
+    # Analyze every case up front, without interleaving output
+    results = [analyzer.analyze_text(test['text']) for test in test_cases]
+    
+    for i, (test, result) in enumerate(zip(test_cases, results), 1):
+        out.append(f"\n{'='*80}")
+        out.append(f"TEST CASE {i}: {test['name']}")
+        out.append(f"{'='*80}")
+        out.append(f"📝 Text: \"{test['text']}\"")
+        out.append(f"🎯 Expected: {test['expected']}")
+        out.append(f"\n{'─'*80}")
         
-        print(f"\n🔍 ANALYSIS RESULTS:")
-        print(f"   Classification: {result['classification']}")
-        print(f"   Confidence: {result['confidence']*100:.1f}%")
-        print(f"\n📊 SCORES:")
-        print(f"   Hate Score: {result['scores']['hate']}")
-        print(f"   Moderate Score: {result['scores']['moderate']}")
-        print(f"   Safe Score: {result['scores']['safe']}")
-        print(f"   Final Score: {result['scores']['final']}")
+        out.append(f"\n🔍 ANALYSIS RESULTS:")
+        out.append(f"   Classification: {result['classification']}")
+        out.append(f"   Confidence: {result['confidence']*100:.1f}%")
+        out.append(f"\n📊 SCORES:")
+        hate, moderate, safe, final = _scores(result['scores'])
+        out.append(f"   Hate Score: {hate}")
+        out.append(f"   Moderate Score: {moderate}")
+        out.append(f"   Safe Score: {safe}")
+        out.append(f"   Final Score: {final}")
         
-        if result['tone_shift']:
-            print(f"\n🔄 TONE SHIFT DETECTED:")
-            print(f"   Type: {result['tone_shift']['shift_type']}")
-            print(f"   From: {result['tone_shift']['start_emotion']}")
-            print(f"   To: {result['tone_shift']['end_emotion']}")
+        tone_shift = result['tone_shift']
+        if tone_shift:
+            shift_type, start_emotion, end_emotion = _tone_shift(tone_shift)
+            out.append(f"\n🔄 TONE SHIFT DETECTED:")
+            out.append(f"   Type: {shift_type}")
+            out.append(f"   From: {start_emotion}")
+            out.append(f"   To: {end_emotion}")
         
-        print(f"\n💬 MESSAGE:")
-        print(f"   {result['message']}")
+        out.append(f"\n💬 MESSAGE:")
+        out.append(f"   {result['message']}")
         
-        if result['details']['hate_words']['count'] > 0:
-            print(f"\n⚠️ HATE WORDS DETECTED:")
-            print(f"   Count: {result['details']['hate_words']['count']}")
-            print(f"   Words: {', '.join(result['details']['hate_words']['words'])}")
-            print(f"   Categories: {', '.join(result['details']['hate_words']['subcategories'])}")
+        hate_words, safe_words = _details(result['details'])
+        count, words = _word_group(hate_words)
+        if count > 0:
+            out.append(f"\n⚠️ HATE WORDS DETECTED:")
+            out.append(f"   Count: {count}")
+            out.append(f"   Words: {', '.join(words)}")
+            out.append(f"   Categories: {', '.join(hate_words['subcategories'])}")
         
-        if result['details']['safe_words']['count'] > 0:
-            print(f"\n✅ POSITIVE WORDS DETECTED:")
-            print(f"   Count: {result['details']['safe_words']['count']}")
-            print(f"   Words: {', '.join(result['details']['safe_words']['words'])}")
+        count, words = _word_group(safe_words)
+        if count > 0:
+            out.append(f"\n✅ POSITIVE WORDS DETECTED:")
+            out.append(f"   Count: {count}")
+            out.append(f"   Words: {', '.join(words)}")
         
-        print(f"\n📈 EMOTION TIMELINE:")
+        out.append(f"\n📈 EMOTION TIMELINE:")
         emotions = [item['emotion'] for item in result['emotion_timeline'] if item]
         if emotions:
             timeline_str = ' → '.join(emotions)
-            print(f"   {timeline_str}")
+            out.append(f"   {timeline_str}")
         
-        print(f"\n{'─'*80}")
+        out.append(f"\n{'─'*80}")
+    
+    out.append(f"\n{'='*80}")
+    out.append(" "*30 + "TESTING COMPLETE")
+    out.append("="*80)
     
-    print(f"\n{'='*80}")
-    print(" "*30 + "TESTING COMPLETE")
-    print("="*80)
+    sys.stdout.write('\n'.join(out) + '\n')
+
+
+def test_batch_matches_single():
+    """analyze_batch must return exactly what analyze_text does, score types included"""
+    analyzer = AdvancedHateSpeechAnalyzer()
+    texts = [
+        'I love everyone but I hate Muslim people',
+        'You are stupid but I still love you',
+        'I believe in peace, equality and respect for all people',
+        'The weather is nice today'
+    ]
+    for text in texts:
+        batch = json.dumps(analyzer.analyze_batch([text])[0], sort_keys=True)
+        single = json.dumps(analyzer.analyze_text(text), sort_keys=True)
+        assert batch == single, text
+    print("✅ analyze_batch matches analyze_text")
 
 
 if __name__ == "__main__":
     test_analyzer()
+    test_batch_matches_single()
@@ -0,0 +1,93 @@
+"""
+Test script for the API server's prediction endpoints
+"""
+
+from contextlib import contextmanager
+import json
+
+import app_server
+
+client = app_server.app.test_client()
+
+
+class StubAnalyzer:
+    """Advanced analyzer stand-in returning a fixed result"""
+
+    def __init__(self, classification, confidence):
+        self.classification = classification
+        self.confidence = confidence
+
+    def analyze_text(self, text, max_items=None):
+        return {
+            'classification': self.classification,
+            'confidence': self.confidence,
+            'message': '',
+            'tone_shift': None,
+            'details': {},
+            'scores': {}
+        }
+
+
+@contextmanager
+def stubbed(**overrides):
+    """Replace app_server globals for one test, with a fresh response cache"""
+    overrides.setdefault('response_cache', app_server.SimpleLRU(app_server.RESPONSE_CACHE_SIZE))
+    saved = {name: getattr(app_server, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(app_server, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(app_server, name, value)
+
+
+def test_skipped_deep_consensus():
+    """A skipped deep model drops out of the /predict/all consensus, the other weights renormalized"""
+    def no_deep(text):
+        raise AssertionError('deep model should have been skipped')
+
+    with stubbed(advanced_analyzer=StubAnalyzer('HATE_SPEECH', 0.95),
+                 basic_model=object(), vectorizer=object(), deep_classifier=object(),
+                 classify_basic=lambda text: (0, 0.11), classify_deep=no_deep):
+        body = client.post('/predict/all', json={'text': 'they are the worst'}).get_json()
+
+    weights = app_server.ALL_MODEL_WEIGHTS
+    expected = (0.95 * weights['advanced'] + (1 - 0.11) * weights['basic']) / (weights['advanced'] + weights['basic'])
+    assert body['deep']['skipped']
+    assert body['consensus']['deep_skipped']
+    assert body['consensus']['confidence'] == round(expected, 4)
+
+
+def test_ojsonify_matches_jsonify_for_non_ascii():
+    """orjson responses must be byte-identical to jsonify's, non-ASCII text included"""
+    data = {'text': 'Café naïve — 你好 😀', 'scores': {'hate': 0, 'safe': 0.25}, 'ok': True}
+    with app_server.app.app_context():
+        assert app_server.ojsonify(data).get_data() == app_server.jsonify(data).get_data()
+
+    # /predict/all echoes the request text back
+    text = 'Ich hasse niemanden — 😀'
+    with stubbed(advanced_analyzer=StubAnalyzer('SAFE', 0.5), basic_model=None, deep_classifier=None):
+        body = client.post('/predict/all', json={'text': text}).get_data()
+    assert body.isascii()
+    assert json.loads(body)['text'] == text
+
+
+def test_response_cache_key_includes_content_type():
+    """A cached JSON response must not be served for the same bytes sent as another content type"""
+    body = json.dumps({'text': 'some text to cache'})
+    with stubbed(advanced_analyzer=StubAnalyzer('SAFE', 0.5), basic_model=None, deep_classifier=None):
+        first = client.post('/predict/all', data=body, content_type='application/json')
+        other = client.post('/predict/all', data=body, content_type='text/plain')
+        again = client.post('/predict/all?debug=1', data=body, content_type='application/json')
+        assert first.status_code == 200
+        assert other.status_code != 200
+        assert again.status_code == 200
+        assert len(app_server.response_cache.data) == 2
+
+
+if __name__ == "__main__":
+    for test in (test_skipped_deep_consensus, test_ojsonify_matches_jsonify_for_non_ascii,
+                 test_response_cache_key_includes_content_type):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,9 @@
+"""
+WSGI entry point for production servers
+Usage: gunicorn -w 4 --threads 8 --preload -b 0.0.0.0:5000 wsgi:app
+"""
+
+from app_server import app
+
+if __name__ == '__main__':
+    app.run(debug=False, host='0.0.0.0', port=5000)